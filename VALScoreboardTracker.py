@@ -4,14 +4,20 @@ Code has been optimised for reading screenshots of final scoreboard in the game
 Lots of code is utilised from https://github.com/eihli/image-table-ocr#org67b1fc2
 '''
 
+import io
 import os
+import re
 import sys
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import cv2
+import numpy as np
 import pytesseract
-from config_parser import create_config, read_config
+from config_parser import create_config, migrate_config, read_config
 from ocr_library import functions as srf
 import pyperclip
 from datetime import datetime
+from pathlib import Path
 import time
 
 def print_status(message):
@@ -62,12 +68,16 @@ def setup_tesseract():
         
         tesseract_exe = os.path.join(tesseract_dir, 'tesseract.exe')
         tessdata_dir = os.path.join(tesseract_dir, 'tessdata')
-        
+
         pytesseract.pytesseract.tesseract_cmd = tesseract_exe
         os.environ['TESSDATA_PREFIX'] = tessdata_dir
-        
+        # Tesseract's OpenMP threading is inefficient; its maintainers recommend
+        # disabling it, which is faster per page and essential with parallel workers.
+        # pytesseract spawns tesseract with the inherited environment.
+        os.environ['OMP_THREAD_LIMIT'] = '1'
+
         return True
-        
+
     except Exception:
         return False
 
@@ -76,90 +86,178 @@ def get_base_path():
         return os.path.dirname(sys.executable)
     return os.path.dirname(os.path.abspath(__file__))
 
+# Agent reference features, set once per worker process by init_worker
+agent_references = None
+
+def init_worker(tesseract_cmd, references):
+    """Configure a worker process (spawned workers start from a fresh import)"""
+    global agent_references
+    # Parallelism comes from the process pool; OpenCV's own thread pool in every
+    # worker would oversubscribe the cores
+    cv2.setNumThreads(1)
+    pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+    agent_references = references
+
+def load_screenshot(file_path, target_height=1080):
+    """Read a screenshot in one call and return its grayscale and colour images"""
+    # Decoding from an in-memory buffer also handles non-ASCII paths, which cv2.imread doesn't on Windows
+    image_colored = cv2.imdecode(np.fromfile(file_path, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if image_colored is None:
+        raise ValueError(f"Could not decode screenshot: {file_path}")
+    # Downscale larger captures once so every later crop (and Tesseract) handles fewer pixels
+    if target_height and image_colored.shape[0] > target_height:
+        scale = target_height / image_colored.shape[0]
+        image_colored = cv2.resize(image_colored, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    image = cv2.cvtColor(image_colored, cv2.COLOR_BGR2GRAY)
+    return image, image_colored
+
+def build_row_filter(config_data):
+    """Compile the team tag or player names into one pattern matched against OCR'd names"""
+    if config_data['teamSorting']:
+        tags = [config_data['team']]
+    else:
+        tags = [player.replace(" ", "") for player in config_data['players']]
+    if not tags:
+        # Nothing configured: match no rows, like any() over an empty list
+        return re.compile(r'(?!)')
+    return re.compile('|'.join(re.escape(tag) for tag in tags))
+
+def build_map_hint(config_data):
+    """Compile the pattern that picks a map name out of a screenshot's filename, or None if disabled"""
+    pattern = config_data['map_hint_regex']
+    if pattern == 'auto':
+        if not config_data['maps']:
+            return None
+        # Whole words only, so e.g. "rebind_test.png" is not read as Bind
+        names = '|'.join(re.escape(map_name.lower()) for map_name in config_data['maps'])
+        pattern = f'(?<![a-z])({names})(?![a-z])'
+    return re.compile(pattern) if pattern else None
+
+def process_screenshot(file_path, maps, row_filter, target_height, map_hint=None):
+    """Run the full OCR pipeline on one screenshot and return its filtered rows"""
+    filename = os.path.basename(file_path)
+    print_status(f"Processing screenshot: {filename}")
+
+    image, image_colored = load_screenshot(file_path, target_height)
+
+    # A map named in the filename skips the OCR-based map detection, but only if
+    # the hint resolves to one of the configured maps (a loose custom regex may not)
+    hint = map_hint.search(filename.lower()) if map_hint else None
+    map_name = srf.get_most_similar(hint.group(0).capitalize(), maps) if hint else None
+    if map_name in maps:
+        print_status(f"{filename}: map taken from filename: {map_name}")
+    else:
+        print_status(f"{filename}: detecting map...")
+        map_name = srf.find_map_name(image, maps)
+        print_status(f"{filename}: map detected: {map_name}")
+
+    print_status(f"{filename}: processing scoreboard table...")
+    image, image_colored = srf.find_tables(image, image_colored)
+
+    print_status(f"{filename}: extracting cell information...")
+    cell_images_rows, headshots_images_rows = srf.extract_cell_images_from_table(image, image_colored)
+    # Every stage works on 8-bit images; a float copy would multiply the memory traffic of each crop
+    assert all(cell.dtype == np.uint8 for row in cell_images_rows + headshots_images_rows for cell in row)
+
+    print_status(f"{filename}: identifying agents...")
+    agents = srf.identify_agents(headshots_images_rows, agent_references)
+
+    print_status(f"{filename}: reading table data...")
+    output = srf.read_table_rows(cell_images_rows)
+    current_date = datetime.now().strftime("%d/%m/%Y")
+
+    print_status(f"{filename}: merging data and applying team/player filters...")
+    # Single pass: skip rows not matching the filter, emit the final row shape directly
+    clean_output = []
+    for i, row in enumerate(output):
+        if not row_filter.search(row[0]):
+            continue
+        clean_output.append([current_date, row[0], map_name, agents[i], *row[1:]])
+
+    return filename, clean_output
+
 def main():
     try:
         print_status("Initializing VALScoreboardTracker...")
-        
-        if not setup_tesseract():
-            print_status("Failed to initialize Tesseract OCR. Please ensure it's properly installed.")
-            wait_for_user()
-            return
 
         base_path = get_base_path()
-        screenshot_folder = os.path.join(base_path, "screenshots")
-        config_path = os.path.join(base_path, "config.ini")
-        scoreboard_path = os.path.join(base_path, "scoreboard.csv")
+        screenshot_folder = Path(base_path, "screenshots")
+        scoreboard_path = Path(base_path, "scoreboard.csv")
 
         print_status("Loading configuration...")
-        if os.path.exists(config_path):
+        try:
             config_data = read_config()
             print_status("Configuration loaded successfully")
-        else:
-            print_status("Creating new configuration file...")
-            config_data = create_config()
+        except FileNotFoundError:
+            try:
+                config_data = migrate_config()
+                print_status("Migrated settings from config.ini to config.toml")
+            except FileNotFoundError:
+                print_status("Creating new configuration file...")
+                config_data = create_config()
+
+        if not setup_tesseract():
+            print_status("Failed to initialize Tesseract OCR. Please ensure it's properly installed.")
+            return
 
         maps = config_data['maps']
+        row_filter = build_row_filter(config_data)
+        # Compiled once per run and shipped to the workers with each task
+        map_hint = build_map_hint(config_data)
 
-        if os.path.exists(scoreboard_path):
-            os.remove(scoreboard_path)
-            print_status("Removed old scoreboard file")
-
-        if os.path.exists(screenshot_folder) and os.path.isdir(screenshot_folder):
-            screenshots = [f for f in os.listdir(screenshot_folder) if f.lower().endswith(".png")]
-            print_status(f"Found {len(screenshots)} screenshots to process")
-
-            for filename in screenshots:
-                file_path = os.path.join(screenshot_folder, filename)
-                print_status(f"Processing screenshot: {filename}")
-
-                image = cv2.imread(file_path, cv2.IMREAD_GRAYSCALE)
-                image_colored = cv2.imread(file_path)
-                
-                print_status("Detecting map...")
-                map_name = srf.find_map_name(image, maps)
-                print_status(f"Map detected: {map_name}")
-
-                print_status("Processing scoreboard table...")
-                image, image_colored = srf.find_tables(image, image_colored)
-
-                print_status("Extracting cell information...")
-                cell_images_rows, headshots_images_rows = srf.extract_cell_images_from_table(image, image_colored)
-
-                print_status("Identifying agents...")
-                agents = srf.identify_agents(headshots_images_rows)
-
-                print_status("Reading table data...")
-                output = srf.read_table_rows(cell_images_rows)
-                current_date = datetime.now().strftime("%d/%m/%Y")
-                
-                print_status("Merging data...")
-                merged_output = [
-                    [current_date] + row[:1] + [map_name] + [agents[i]] + row[1:] if isinstance(agents[i], str) else [map_name] + row[:1] + agents[i] + row[1:]
-                    for i, row in enumerate(output)
-                ]
-
-                print_status("Applying team/player filters...")
-                if config_data['teamSorting']:
-                    filtered_output = [row for row in merged_output if config_data['team'] in row[1]]
-                else:
-                    config_data['players'] = [player.replace(" ", "") for player in config_data['players']]
-                    filtered_output = [row for row in merged_output if any(player in row[1] for player in config_data['players'])]
-
-                srf.write_csv(filtered_output)
-                print_status(f"Data written to CSV for {filename}")
+        scoreboard_path.unlink(missing_ok=True)
+        print_status("Cleared old scoreboard file")
 
-        else:
+        try:
+            with os.scandir(screenshot_folder) as entries:
+                screenshots = [e.path for e in entries if e.is_file() and e.name.lower().endswith(".png")]
+        except (FileNotFoundError, NotADirectoryError):
+            screenshots = []
+        if not screenshots:
             print_status("No screenshots folder found or no PNG files to process")
             return
+        print_status(f"Found {len(screenshots)} screenshots to process")
+
+        print_status("Loading agent reference images...")
+        references = srf.preprocess_agents()
+
+        # Scale by running one single-threaded Tesseract process per core
+        results = {}
+        with ProcessPoolExecutor(
+            max_workers=min(os.cpu_count() or 1, len(screenshots)),
+            initializer=init_worker,
+            initargs=(pytesseract.pytesseract.tesseract_cmd, references),
+        ) as pool:
+            futures = {
+                pool.submit(process_screenshot, p, maps, row_filter, config_data['target_height'], map_hint): p
+                for p in screenshots
+            }
+            for future in as_completed(futures):
+                file_path = futures[future]
+                try:
+                    filename, clean_output = future.result()
+                except Exception as e:
+                    # Skip the broken screenshot but keep the rows of all the others
+                    print_status(f"Skipping {os.path.basename(file_path)}: {str(e)}")
+                    continue
+                results[file_path] = clean_output
+                print_status(f"Finished processing {filename}")
+
+        if len(results) < len(screenshots):
+            print_status(f"{len(screenshots) - len(results)} screenshot(s) could not be processed, see messages above")
 
-        print_status("Cleaning up temporary files...")
-        if os.path.exists(os.path.join(base_path, 'temp_headshot.png')):
-            os.remove(os.path.join(base_path, 'temp_headshot.png'))
-            print_status("Temporary files cleaned up")
+        # Collect in directory order so the CSV does not depend on completion order
+        all_rows = []
+        for file_path in screenshots:
+            all_rows.extend(results.get(file_path, []))
 
-        print_status("Reading final scoreboard data...")
-        with open(scoreboard_path, "r", encoding="utf-8") as file:
-            scoreboard_data = file.read()
+        # Build the CSV in memory so the clipboard doesn't need to re-read the file
+        buf = io.StringIO()
+        srf.write_csv(all_rows, buf)
+        scoreboard_data = buf.getvalue()
+        with open(scoreboard_path, "w", newline="", encoding="utf-8") as file:
+            file.write(scoreboard_data)
+        print_status(f"Data written to CSV for {len(results)} screenshots")
 
         pyperclip.copy(scoreboard_data)
         print_status("Scoreboard data copied to clipboard")
@@ -174,4 +272,6 @@ def main():
         wait_for_user()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    # Required for worker processes in the frozen Windows executable
+    multiprocessing.freeze_support()
+    main()
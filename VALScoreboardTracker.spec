@@ -5,8 +5,8 @@ a = Analysis(
     ['VALScoreboardTracker.py'],
     pathex=[],
     binaries=[('Tesseract-OCR/tesseract.exe', 'Tesseract-OCR/'), ('Tesseract-OCR/*.dll', 'Tesseract-OCR/')],
-    datas=[('agent-images', 'agent-images'), ('config.ini', '.'), ('Tesseract-OCR/tessdata/*', 'Tesseract-OCR/tessdata/')],
-    hiddenimports=['pytesseract', 'PIL', 'numpy', 'cv2', 'configparser'],
+    datas=[('agent-images', 'agent-images'), ('config.toml', '.'), ('Tesseract-OCR/tessdata/*', 'Tesseract-OCR/tessdata/')],
+    hiddenimports=['pytesseract', 'PIL', 'numpy', 'cv2', 'tomllib'],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
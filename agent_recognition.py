@@ -71,12 +71,21 @@ def match_histogram(image1, image2):
     hist2 = cv2.normalize(hist2, hist2).flatten()
     return cv2.compareHist(hist1, hist2, cv2.HISTCMP_CORREL)
 
-def find_matching_agent(input_image_path, reference_images, agent_names):
-    # Convert to absolute path if relative
-    if not os.path.isabs(input_image_path):
-        input_image_path = os.path.join(get_base_path(), input_image_path)
-        
-    input_image = cv2.imread(input_image_path, cv2.IMREAD_GRAYSCALE)
+# Preprocess the reference images once per run so they aren't redone for every headshot
+def prepare_reference_features(reference_images, agent_names):
+    references = []
+    for ref_image, agent_name in zip(reference_images, agent_names):
+        ref_image_gray = cv2.cvtColor(ref_image, cv2.COLOR_BGR2GRAY)
+        ref_image_gray = resize_image(ref_image_gray, (50, 50))
+        ref_image_gray = equalize_histogram(ref_image_gray)
+        _, ref_sift_descriptors = extract_sift_features(ref_image_gray)
+        _, ref_orb_descriptors = extract_orb_features(ref_image_gray)
+        references.append((agent_name, ref_image_gray, ref_sift_descriptors, ref_orb_descriptors))
+    return references
+
+def find_matching_agent(headshot_image, references):
+    # Headshots come straight from the colour screenshot, no temp file needed
+    input_image = cv2.cvtColor(headshot_image, cv2.COLOR_BGR2GRAY)
     input_image = resize_image(input_image, (50, 50))
     input_image = equalize_histogram(input_image)
     
@@ -87,17 +96,11 @@ def find_matching_agent(input_image_path, reference_images, agent_names):
     max_hist_score = 0
     matching_agent = None
     
-    for i, ref_image in enumerate(reference_images):
-        ref_image_gray = cv2.cvtColor(ref_image, cv2.COLOR_BGR2GRAY)
-        ref_image_gray = resize_image(ref_image_gray, (50, 50))
-        ref_image_gray = equalize_histogram(ref_image_gray)
-        
+    for agent_name, ref_image_gray, ref_sift_descriptors, ref_orb_descriptors in references:
         # Feature matching using SIFT
-        _, ref_sift_descriptors = extract_sift_features(ref_image_gray)
         sift_matches = match_sift_features(sift_descriptors, ref_sift_descriptors)
         
         # Feature matching using ORB
-        _, ref_orb_descriptors = extract_orb_features(ref_image_gray)
         orb_matches = match_orb_features(orb_descriptors, ref_orb_descriptors)
         
         # Histogram matching
@@ -109,6 +112,6 @@ def find_matching_agent(input_image_path, reference_images, agent_names):
         if total_matches > max_matches:
             max_matches = total_matches
             max_hist_score = hist_score
-            matching_agent = agent_names[i]
+            matching_agent = agent_name
     
     return matching_agent
\ No newline at end of file
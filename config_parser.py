@@ -1,55 +1,109 @@
 import configparser
+import functools
 import json
 import os
 import sys
+import tomllib
+
+# Written when no config.toml (or legacy config.ini) exists yet
+DEFAULT_VALUES = {
+    'team': 'NOVO',
+    'players': [],
+    'teamSorting': False,
+    'maps': [],
+    'target_height': 1080,
+    'map_hint_regex': 'auto',
+}
+
+REQUIRED_KEYS = ('team', 'players', 'teamSorting', 'maps')
+
+# The fixed crop offsets and kernel sizes in ocr_library are tuned for 1080p screenshots,
+# so they can't be downscaled any further than that
+MIN_TARGET_HEIGHT = 1080
 
 def get_base_path():
     if getattr(sys, 'frozen', False):
         return os.path.dirname(sys.executable)
     return os.path.dirname(os.path.abspath(__file__))
 
-def create_config():
-    config = configparser.ConfigParser()
-    
-    # Add sections and key-value pairs
-    config['General'] = {
-        'team': 'NOVO',
-        'players': [],
-        'teamSorting': 'false',
-        'maps': [],
-    }
+def write_config(values):
+    # Get the absolute path for config.toml
+    config_path = os.path.join(get_base_path(), 'config.toml')
+
+    # JSON strings, numbers, booleans and lists of strings are TOML values too. Non-ASCII
+    # characters are written as-is: escaped surrogate pairs (emoji) are invalid TOML,
+    # and CJK names should stay readable in a hand-edited file.
+    lines = ['[General]'] + [f'{key} = {json.dumps(value, ensure_ascii=False)}' for key, value in values.items()]
+    text = '\n'.join(lines) + '\n'
+
+    # Parse the result before writing, so a value TOML can't represent never leaves
+    # behind a config.toml that breaks every later run
+    try:
+        tomllib.loads(text)
+    except tomllib.TOMLDecodeError as e:
+        raise ValueError(f"Settings can't be saved to config.toml, please check them: {e}") from e
 
-    # Get the absolute path for config.ini
-    config_path = os.path.join(get_base_path(), 'config.ini')
-    
     # Write the configuration to a file
-    with open(config_path, 'w') as configfile:
-        config.write(configfile)
+    with open(config_path, 'w', encoding='utf-8') as configfile:
+        configfile.write(text)
 
+def create_config():
+    write_config(DEFAULT_VALUES)
     return read_config()
 
-def read_config():
-    # Create a ConfigParser object
+def migrate_config():
+    # Carry the settings of a pre-TOML config.ini over into config.toml
+    ini_path = os.path.join(get_base_path(), 'config.ini')
+    if not os.path.exists(ini_path):
+        raise FileNotFoundError(ini_path)
+
     config = configparser.ConfigParser()
+    config.read(ini_path)
+
+    values = dict(DEFAULT_VALUES)
+    values['team'] = config.get('General', 'team')
+    values['players'] = json.loads(config.get('General', 'players'))
+    values['teamSorting'] = config.getboolean('General', 'teamSorting')
+    values['maps'] = json.loads(config.get('General', 'maps'))
+    write_config(values)
+
+    return read_config()
+
+@functools.lru_cache(maxsize=4)
+def _read_config_cached(config_path, mtime):
+    # Read the configuration file; lists are native TOML arrays, so one parse is enough
+    with open(config_path, 'rb') as configfile:
+        general = tomllib.load(configfile).get('General', {})
+
+    # TOML keys are case-sensitive, the old config.ini keys were not (e.g. "teamsorting")
+    config = {key.lower(): value for key, value in general.items()}
+    missing = [key for key in REQUIRED_KEYS if key.lower() not in config]
+    if missing:
+        raise ValueError(f"config.toml is missing required setting(s) in [General]: {', '.join(missing)}")
     
-    # Get the absolute path for config.ini
-    config_path = os.path.join(get_base_path(), 'config.ini')
-    
-    # Read the configuration file
-    config.read(config_path)
-    
-    # Access values from the configuration file
-    teamSorting = config.getboolean('General', 'teamSorting')
-    team = config.get('General', 'team')
-    players = json.loads(config.get('General', 'players'))
-    maps = json.loads(config.get('General', 'maps'))
+    target_height = config.get('target_height', DEFAULT_VALUES['target_height'])
+    if type(target_height) is not int or (target_height != 0 and target_height < MIN_TARGET_HEIGHT):
+        raise ValueError(
+            f"target_height in config.toml must be 0 (no resizing) or a whole number of at least {MIN_TARGET_HEIGHT}, got {target_height!r}"
+        )
     
     # Return a dictionary with the retrieved values
     config_values = {
-        'teamSorting': teamSorting,
-        'team': team,
-        'players': players,
-        'maps': maps,
+        'teamSorting': config['teamsorting'],
+        'team': config['team'],
+        'players': tuple(config['players']),
+        'maps': tuple(config['maps']),
+        'target_height': target_height,
+        'map_hint_regex': config.get('map_hint_regex', DEFAULT_VALUES['map_hint_regex']),
     }
     
-    return config_values
\ No newline at end of file
+    return config_values
+
+def read_config():
+    # Get the absolute path for config.toml
+    config_path = os.path.join(get_base_path(), 'config.toml')
+
+    # Cached per file modification time, so edits to config.toml are still picked up.
+    # Lists are stored as tuples and a copy of the dict is returned so callers
+    # can't modify the cached values.
+    return dict(_read_config_cached(config_path, os.path.getmtime(config_path)))
@@ -10,11 +10,14 @@ import cv2
 import numpy as np
 import pytesseract
 import logging
-from agent_recognition import find_matching_agent, load_images_from_folder
+from agent_recognition import find_matching_agent, load_images_from_folder, prepare_reference_features
 
 #Setting up tesseract - only needs this if you have directly installed tesseract (I think).
 pytesseract.pytesseract.tesseract_cmd = "tesseract"
 
+# Translation table deleting ASCII punctuation from OCR output in one C-level pass (whitespace is kept)
+_STRIP_ASCII_PUNCT = str.maketrans('', '', ''.join(chr(i) for i in range(128) if not (chr(i).isalnum() or chr(i).isspace())))
+
 
 class functions:
 
@@ -40,7 +43,7 @@ class functions:
         map_region = thresh[60:140, 60:300]  # Adjusted for standard VALORANT scoreboard
 
         # Use Tesseract OCR to extract text
-        custom_config = r'--psm 6'  # PSM 6 treats text as a block
+        custom_config = r'--oem 1 --psm 6'  # LSTM engine only, PSM 6 treats text as a block
         extracted_text = pytesseract.image_to_string(map_region, config=custom_config, lang='eng')
         # print(f"OCR Extracted Text: '{extracted_text.strip()}'") Debug Prints
 
@@ -50,6 +53,8 @@ class functions:
         # Extract only the last word after "MAP - "
         if "MAP -" in extracted_map_name:
             extracted_map_name = extracted_map_name.split("MAP -")[-1].strip()
+        # Drop stray OCR punctuation (e.g. "ASCENT." or "|BIND") before fuzzy matching
+        extracted_map_name = ' '.join(extracted_map_name.translate(_STRIP_ASCII_PUNCT).split())
          # print(f"Extracted Map Name: '{extracted_map_name}'") Debug Prints
 
         # Apply fuzzy matching to correct OCR errors
@@ -285,7 +290,7 @@ class functions:
             cropped = image[y:min(img_h, y+h+NUM_PX_COMMA), x:min(img_w, x+w)]
         else:
             # If we morphed out all of the text, assume an empty image.
-            cropped = MAX_COLOR_VAL * np.ones(shape=(20, 100), dtype=np.uint8)
+            cropped = np.full((20, 100), MAX_COLOR_VAL, dtype=np.uint8)
         bordered = cv2.copyMakeBorder(cropped, 5, 5, 5, 5, cv2.BORDER_CONSTANT, None, 255)
         return bordered
 
@@ -457,20 +462,29 @@ class functions:
         """
         non_overlapping_rectangles = []
         overlapping_rectangles = []
+
+        # Compute the pairwise overlap matrix in one vectorized pass instead of a
+        # Python-level double loop over every pair of rectangles.
+        rects = np.asarray(rectangles, dtype=np.int64).reshape(-1, 4)
+        x, y, w, h = rects.T
+        overlap_matrix = (
+            (x[:, None] < (x + w)[None, :]) & ((x + w)[:, None] > x[None, :]) &
+            (y[:, None] < (y + h)[None, :]) & ((y + h)[:, None] > y[None, :])
+        )
+        np.fill_diagonal(overlap_matrix, False)
+        areas = w * h
+
         for i, rect1 in enumerate(rectangles):
-            overlaps = False
-            for j, rect2 in enumerate(rectangles):
-                if i != j:
-                    if rect1[0] < rect2[0] + rect2[2] and rect1[0] + rect1[2] > rect2[0] and rect1[1] < rect2[1] + rect2[3] and rect1[1] + rect1[3] > rect2[1]:
-                        overlaps = True
-                        if rect1[2] * rect1[3] > rect2[2] * rect2[3]:
-                            larger_rect = rect1
-                            smaller_rect = rect2
-                        else:
-                            larger_rect = rect2
-                            smaller_rect = rect1
-                        break
-            if overlaps:
+            if overlap_matrix[i].any():
+                # First overlapping rectangle, as in the original pairwise scan
+                j = int(overlap_matrix[i].argmax())
+                rect2 = rectangles[j]
+                if areas[i] > areas[j]:
+                    larger_rect = rect1
+                    smaller_rect = rect2
+                else:
+                    larger_rect = rect2
+                    smaller_rect = rect1
                 overlapping_rectangles.append(smaller_rect)
             else:
                 non_overlapping_rectangles.append(rect1)
@@ -526,15 +540,16 @@ class functions:
 
             #Process image for OCR
             image=functions.image_process(image)
+            # OCR input stays 8-bit; a float promotion here would be 8x the bytes per upscaled row
+            assert image.dtype == np.uint8
             name=image[0:100*scale,0:300*scale]
             # cv2.imwrite("debug/name-" + str(n) + ".png",name)
 
             #OCR the name.
-            ocr_name = functions.ocr_image(name, '-c tessedit_char_whitelist=abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789/_ --psm 7', 'eng+kor+jpn+chi_sim')
-            if str(ocr_name).strip() == "":
-                ocr_name = "err"
-            temp_output.append(str(ocr_name).strip())
-            logging.info("Name: " + str(ocr_name).strip())
+            ocr_name = functions.ocr_image(name, '-c tessedit_char_whitelist=abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789/_ --oem 1 --psm 7', 'eng+kor+jpn+chi_sim')
+            ocr_name = ocr_name.strip() or "err"
+            temp_output.append(ocr_name)
+            logging.info("Name: %s", ocr_name)
 
             #OCR each cell to get numbers
             for c, cnt in enumerate(cells):
@@ -547,57 +562,58 @@ class functions:
                 cropped = cv2.dilate(cropped, kernel, iterations=1)
                 #cropped = cv2.copyMakeBorder(cropped, 2, 2, 2, 2, cv2.BORDER_CONSTANT, None, 0)
                 #cv2.imwrite("crop"+str(c)+".png",cropped)
-                ocr_cropped=functions.ocr_image(cropped, '-c tessedit_char_whitelist=0123456789 --psm 7', 'eng')
-                temp_output.append(str(ocr_cropped).strip())
+                ocr_cropped=functions.ocr_image(cropped, '-c tessedit_char_whitelist=0123456789 --oem 1 --psm 7', 'eng')
+                temp_output.append(ocr_cropped.strip())
             temp_output = [e for e in temp_output if e]
             output.append(temp_output)
         # remove the sorting step
         # output = sorted(output,  key=lambda x: x[0])
         return output
 
-    def write_csv(output):
+    def write_csv(output, f):
         """
-        Writes the output list to a CSV file named "scoreboard.csv".
+        Writes the output list in csv format to a file-like object in a single pass.
 
         Parameters:
         output (list): A list of lists containing the data to write to the CSV file.
+        f (file-like): Text stream to write to, e.g. an io.StringIO buffer.
 
         Returns:
         None
         """
-        #Write the output file in csv format.
-        with open('scoreboard.csv', 'a', newline='') as f:
-            writer = csv.writer(f,delimiter=';')
-            writer.writerows(output)
+        writer = csv.writer(f,delimiter=';')
+        writer.writerows(output)
 
 
-    def identify_agents(headshots_images_rows):
+    def preprocess_agents(reference_folder='./agent-images'):
+        """
+        Loads the agent reference images and precomputes their features.
+
+        Parameters:
+        reference_folder (str): Folder containing one portrait per agent.
+
+        Returns:
+        List[tuple]: (agent name, grayscale image, SIFT descriptors, ORB descriptors) per agent.
+        """
+        reference_images, agent_names = load_images_from_folder(reference_folder)
+        return prepare_reference_features(reference_images, agent_names)
+
+    def identify_agents(headshots_images_rows, agent_references):
         """
         Identifies agents from the headshot images.
 
         Parameters:
         headshots (List[numpy.ndarray]): A list of headshot images.
+        agent_references (List[tuple]): Reference features from preprocess_agents.
 
         Returns:
         List[str]: A list of agent names.
         """
-        # Load reference images and agent names
-        reference_folder = './agent-images'
-        reference_images, agent_names = load_images_from_folder(reference_folder)
-
         identified_agents = []
-        n=0
-        temp_image_path = './temp_headshot.png'
         for row in headshots_images_rows:
-            n+=1
-            # Save the headshot temporarily
-            cv2.imwrite(temp_image_path, row[0])
-
             # Identify the agent
-            agent_name = find_matching_agent(temp_image_path, reference_images, agent_names)
+            agent_name = find_matching_agent(row[0], agent_references)
             agent_name = agent_name.capitalize() # Capitalization of Agent Name
             identified_agents.append(agent_name)
-        # remove temp_headshot.png
-        # os.remove(temp_image_path)
 
         return identified_agents